@@ -4,7 +4,7 @@ from typing import List
 import numpy as np
 from camera_toolkit.reproject import project_world_to_image_plane
 from cloth_manipulation.geometry import get_ordered_keypoints, move_closer, pose_from_orientation_and_position
-from cloth_manipulation.gui import draw_keypoints, draw_pose
+from cloth_manipulation.gui import draw_keypoints, draw_pose, project_world_points_to_image_plane
 from cloth_manipulation.hardware.base_classes import DualArm
 from cloth_manipulation.motion_primitives.fold_execution import execute_dual_fold_trajectories
 from cloth_manipulation.motion_primitives.fold_trajectory_parameterization import CircularFoldTrajectory
@@ -132,11 +132,9 @@ class FoldTowelController(DualArmController):
         fold_trajectory_left, fold_trajectory_right = FoldTowelController.get_fold_trajectories(keypoints)
 
         def draw_trajectory(image, trajectory, world_to_camera, camera_matrix):
-            waypoints = [trajectory._fold_pose(completion)[:3, -1] for completion in np.linspace(0, 1, 20)]
-            waypoints_image = [
-                project_world_to_image_plane(waypoint, world_to_camera, camera_matrix) for waypoint in waypoints
-            ]
-            waypoints_image = np.array(waypoints_image, np.int32).reshape((-1, 1, 2))
+            waypoints = trajectory.get_fold_path(20)[:, :3, -1]
+            waypoints_image = project_world_points_to_image_plane(waypoints, world_to_camera, camera_matrix)
+            waypoints_image = waypoints_image.astype(np.int32).reshape((-1, 1, 2))
             image = cv2.polylines(image, [waypoints_image], isClosed=False, color=(0, 255, 255), thickness=2)
 
             for completion in np.linspace(0, 1, 3):
@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.spatial.transform import Rotation
 
 
 def pose_from_orientation_and_position(orientation, position):
@@ -21,11 +20,21 @@ def angle_2D(v0, v1):
 
 def rotate_point(point, rotation_origin, rotation_axis, angle):
     unit_axis = rotation_axis / np.linalg.norm(rotation_axis)
-    rotation = Rotation.from_rotvec(angle * unit_axis)
-    point_new = rotation.as_matrix() @ (point - rotation_origin) + rotation_origin
+    rotation_matrix = rotation_matrix_from_rotvec(angle * unit_axis)
+    point_new = rotation_matrix @ (point - rotation_origin) + rotation_origin
     return point_new
 
 
+def rotation_matrix_from_rotvec(rotvec) -> np.ndarray:
+    """Rodrigues' formula, a cheaper equivalent of Rotation.from_rotvec(rotvec).as_matrix() for a single rotation."""
+    angle = np.linalg.norm(rotvec)
+    if angle == 0.0:
+        return np.eye(3)
+    x, y, z = rotvec / angle
+    K = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return np.eye(3) + np.sin(angle) * K + (1.0 - np.cos(angle)) * (K @ K)
+
+
 def get_ordered_keypoints(keypoints):
     """
     orders keypoints according to their angle w.r.t. a frame that is created by translating the world frame to the center of the cloth.
@@ -33,16 +42,18 @@ def get_ordered_keypoints(keypoints):
     """
     keypoints = np.array(keypoints)
     center = np.mean(keypoints, axis=0)
-    x_axis = np.array([1, 0])
-    angles = [angle_2D(x_axis, keypoint - center) for keypoint in keypoints]
-    angles = [angle % (2 * np.pi) for angle in angles]  # make angles positive from 0 to 2*pi
+    center_to_keypoints = keypoints - center
+    # same as angle_2D([1, 0], keypoint - center) for each keypoint, but for all keypoints at once.
+    angles = np.arctan2(center_to_keypoints[:, 1], center_to_keypoints[:, 0])
+    angles = angles % (2 * np.pi)  # make angles positive from 0 to 2*pi
     keypoints_sorted = keypoints[np.argsort(angles)]
     return list(keypoints_sorted)
 
 
 def get_short_and_long_edges(ordered_corners):
     edges = [(i, (i + 1) % 4) for i in range(4)]
-    edge_lengths = [np.linalg.norm(ordered_corners[id0] - ordered_corners[id1]) for (id0, id1) in edges]
+    ordered_corners = np.asarray(ordered_corners)
+    edge_lengths = np.linalg.norm(ordered_corners - np.roll(ordered_corners, -1, axis=0), axis=1)
     edge_pairs = [(0, 2), (1, 3)]
     edge_pairs_mean_length = []
     for eid0, eid1 in edge_pairs:
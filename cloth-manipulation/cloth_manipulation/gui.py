@@ -6,6 +6,11 @@ from camera_toolkit.reproject import project_world_to_image_plane
 from cloth_manipulation.input_transform import InputTransform
 from cloth_manipulation.motion_primitives.pull import ReorientTowelPull
 
+# The GUI only works on small images (panels of at most 960x540), for which OpenCV's thread pool costs more than it
+# gains. Lower or raise this number if the GUI runs alongside other OpenCV-heavy work.
+OPENCV_NUM_THREADS = 1
+cv2.setNumThreads(OPENCV_NUM_THREADS)
+
 
 class Panel:
     def __init__(self, image_buffer):
@@ -22,44 +27,65 @@ class Panel:
         aspect_ratio_close = np.isclose(panel_aspect_ratio, image_aspect_ratio)
 
         if aspect_ratio_close or not keep_aspect_ratio:
-            image = cv2.resize(image, (panel_width, panel_height))
-            buffer[:, :, :] = image
-            return buffer
-
-        if image_aspect_ratio > panel_aspect_ratio:
+            new_width, new_height = panel_width, panel_height
+        elif image_aspect_ratio > panel_aspect_ratio:
             scale_factor = float(panel_width) / float(image_width)
-            new_height = int(image_height * scale_factor)
-            image = cv2.resize(image, (panel_width, new_height))
-            padding_top = (panel_height - new_height) // 2
-            buffer[padding_top : padding_top + new_height, :] = image
-            return buffer
+            new_width, new_height = panel_width, int(image_height * scale_factor)
         else:
             scale_factor = float(panel_height) / float(image_height)
-            new_width = int(image_width * scale_factor)
-            image = cv2.resize(image, (new_width, panel_height))
-            padding_left = (panel_width - new_width) // 2
-            buffer[:, padding_left : padding_left + new_width, :] = image
-            return buffer
+            new_width, new_height = int(image_width * scale_factor), panel_height
+
+        # Letterbox: center the resized image, the padding is left untouched.
+        padding_top = (panel_height - new_height) // 2
+        padding_left = (panel_width - new_width) // 2
+        destination = buffer[padding_top : padding_top + new_height, padding_left : padding_left + new_width]
+        cv2.resize(image, (new_width, new_height), dst=destination)
+        return buffer
 
     def fill_image_buffer(self, image, keep_aspect_ratio=True):
         self.image_buffer = Panel.fit_image_into_buffer(image, self.image_buffer, keep_aspect_ratio)
 
+    def reset(self):
+        """Clears the panel in place, no new buffer is allocated."""
+        self.image_buffer.fill(0)
+
 
 class FourPanels:
     def __init__(self, width: int = 1920, height: int = 1080):
         """HxWxC BGR"""
         rows = height
         columns = width
-        middle_row = rows // 2
-        middle_column = columns // 2
-        self.image_buffer = np.zeros((1080, 1920, 3), dtype=np.uint8)
-        self.top_left = Panel(self.image_buffer[:middle_row, :middle_column])
-        self.top_right = Panel(self.image_buffer[:middle_row, middle_column:])
-        self.bottom_left = Panel(self.image_buffer[middle_row:, :middle_column])
-        self.bottom_right = Panel(self.image_buffer[middle_row:, middle_column:])
+        self.middle_row = rows // 2
+        self.middle_column = columns // 2
+        self.image_buffer = np.zeros((rows, columns, 3), dtype=np.uint8)
+
+        # Each panel gets its own contiguous buffer (instead of a strided view into image_buffer) so OpenCV can write
+        # whole rows at once. Call compose() to copy them into image_buffer before displaying it.
+        top_height, bottom_height = self.middle_row, rows - self.middle_row
+        left_width, right_width = self.middle_column, columns - self.middle_column
+        self.top_left = Panel(np.zeros((top_height, left_width, 3), dtype=np.uint8))
+        self.top_right = Panel(np.zeros((top_height, right_width, 3), dtype=np.uint8))
+        self.bottom_left = Panel(np.zeros((bottom_height, left_width, 3), dtype=np.uint8))
+        self.bottom_right = Panel(np.zeros((bottom_height, right_width, 3), dtype=np.uint8))
+
+    def reset(self):
+        """Clears all panels and the composed image in place. Reuse one FourPanels and reset it between frames
+        instead of constructing a new one, which allocates a new full-size buffer each time."""
+        for panel in (self.top_left, self.top_right, self.bottom_left, self.bottom_right):
+            panel.reset()
+        self.image_buffer.fill(0)
+
+    def compose(self) -> np.ndarray:
+        """Copies the four panel buffers into image_buffer."""
+        self.image_buffer[: self.middle_row, : self.middle_column] = self.top_left.image_buffer
+        self.image_buffer[: self.middle_row, self.middle_column :] = self.top_right.image_buffer
+        self.image_buffer[self.middle_row :, : self.middle_column] = self.bottom_left.image_buffer
+        self.image_buffer[self.middle_row :, self.middle_column :] = self.bottom_right.image_buffer
+        return self.image_buffer
 
 
 def draw_center_circle(image) -> np.ndarray:
+    assert image.dtype == np.uint8, "expecting a uint8 image, convert float images once before drawing"
     h, w, _ = image.shape
     center_u = w // 2
     center_v = h // 2
@@ -69,52 +95,62 @@ def draw_center_circle(image) -> np.ndarray:
 
 
 def draw_cloth_transform_rectangle(image_full_size) -> np.ndarray:
-    u_top = InputTransform.crop_start_u
-    u_bottom = u_top + InputTransform.crop_width
-    v_top = InputTransform.crop_start_v
-    v_bottom = v_top + InputTransform.crop_height
-
-    top_left = (u_top, v_top)
-    bottom_right = (u_bottom, v_bottom)
-
+    assert image_full_size.dtype == np.uint8, "expecting a uint8 image, convert float images once before drawing"
+    top_left, bottom_right = InputTransform.crop_rectangle()
     image = cv2.rectangle(image_full_size, top_left, bottom_right, (255, 0, 0), thickness=2)
     return image
 
 
 def insert_transformed_into_original(original, transformed):
-    u_top = InputTransform.crop_start_u
-    u_bottom = u_top + InputTransform.crop_width
-    v_top = InputTransform.crop_start_v
-    v_bottom = v_top + InputTransform.crop_height
+    (u_top, v_top), (u_bottom, v_bottom) = InputTransform.crop_rectangle()
 
-    transformed_unresized = cv2.resize(transformed, (InputTransform.crop_width, InputTransform.crop_height))
-    original[
-        v_top:v_bottom,
-        u_top:u_bottom,
-    ] = transformed_unresized
+    crop = original[v_top:v_bottom, u_top:u_bottom]
+    if transformed.shape[:2] == crop.shape[:2]:
+        crop[:] = transformed
+        return
+
+    # Resize straight into the crop region of the original instead of into a temporary image.
+    cv2.resize(transformed, (u_bottom - u_top, v_bottom - v_top), dst=crop)
+
+
+def project_world_points_to_image_plane(points, world_to_camera, camera_matrix) -> np.ndarray:
+    """Projects an (N, 3) array of world points to an (N, 2) array of image coordinates with a single matmul."""
+    points = np.asarray(points, dtype=float)
+    points_homogeneous = np.column_stack([points, np.ones(len(points))])
+    points_in_camera = (world_to_camera @ points_homogeneous.T)[:3]
+    points_in_image = camera_matrix @ points_in_camera
+    return (points_in_image[:2] / points_in_image[2]).T
 
 
 def draw_world_axes(image, world_to_camera, camera_matrix):
-    origin = project_world_to_image_plane(np.zeros(3), world_to_camera, camera_matrix).astype(int)
-    image = cv2.circle(image, origin.T, 10, (0, 255, 255), thickness=2)
-
-    x_pos = project_world_to_image_plane([1.0, 0.0, 0.0], world_to_camera, camera_matrix).astype(int)
-    x_neg = project_world_to_image_plane([-1.0, 0.0, 0.0], world_to_camera, camera_matrix).astype(int)
-    y_pos = project_world_to_image_plane([0.0, 1.0, 0.0], world_to_camera, camera_matrix).astype(int)
-    y_neg = project_world_to_image_plane([0.0, -1.0, 0.0], world_to_camera, camera_matrix).astype(int)
-    image = cv2.line(image, x_pos.T, origin.T, color=(0, 0, 255), thickness=2)
-    image = cv2.line(image, x_neg.T, origin.T, color=(100, 100, 255), thickness=2)
-    image = cv2.line(image, y_pos.T, origin.T, color=(0, 255, 0), thickness=2)
-    image = cv2.line(image, y_neg.T, origin.T, color=(150, 255, 150), thickness=2)
-
-    z_pos = project_world_to_image_plane([0.0, 0.0, 1.0], world_to_camera, camera_matrix).astype(int)
-    image = cv2.line(image, z_pos.T, origin.T, color=(255, 0, 0), thickness=2)
+    assert image.dtype == np.uint8, "expecting a uint8 image, convert float images once before drawing"
+    axes_points = np.array(
+        [
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [-1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.0, -1.0, 0.0],
+            [0.0, 0.0, 1.0],
+        ]
+    )
+    axes_image = project_world_points_to_image_plane(axes_points, world_to_camera, camera_matrix).astype(int)
+    origin, x_pos, x_neg, y_pos, y_neg, z_pos = axes_image
+
+    image = cv2.circle(image, origin, 10, (0, 255, 255), thickness=2)
+    image = cv2.line(image, x_pos, origin, color=(0, 0, 255), thickness=2)
+    image = cv2.line(image, x_neg, origin, color=(100, 100, 255), thickness=2)
+    image = cv2.line(image, y_pos, origin, color=(0, 255, 0), thickness=2)
+    image = cv2.line(image, y_neg, origin, color=(150, 255, 150), thickness=2)
+    image = cv2.line(image, z_pos, origin, color=(255, 0, 0), thickness=2)
     return image
 
 
 def draw_keypoints(image, keypoints: List[np.ndarray], world_to_camera, camera_matrix):
-    for keypoint in keypoints:
-        keypoint = project_world_to_image_plane(keypoint, world_to_camera, camera_matrix).astype(int)
+    if len(keypoints) == 0:
+        return image
+    keypoints_image = project_world_points_to_image_plane(keypoints, world_to_camera, camera_matrix).astype(int)
+    for keypoint in keypoints_image:
         image = cv2.circle(image, keypoint, 1, color=(0, 0, 255), thickness=2)
     return image
 
@@ -146,9 +182,7 @@ def visualize_reorient_towel_pull(image, pull: ReorientTowelPull, world_to_camer
     draw_pose(image, pull.end_pose, world_to_camera, camera_matrix)
 
     def draw_corners(image, corners, color, draw_ids=False):
-        corners_image = [
-            project_world_to_image_plane(corner, world_to_camera, camera_matrix).astype(int) for corner in corners
-        ]
+        corners_image = project_world_points_to_image_plane(corners, world_to_camera, camera_matrix).astype(int)
         corners_image_for_polyline = np.array(corners_image, np.int32).reshape((-1, 1, 2))
         image = cv2.polylines(image, [corners_image_for_polyline], True, color, thickness=2)
 
@@ -163,11 +197,13 @@ def visualize_reorient_towel_pull(image, pull: ReorientTowelPull, world_to_camer
     image = draw_corners(image, pull.centered_corners, (255, 255, 0))
     image = draw_corners(image, pull.desired_corners, (0, 255, 0))
 
-    for corner, desired_corner in zip(pull.ordered_corners, pull.desired_corners):
-        corner_image = project_world_to_image_plane(corner, world_to_camera, camera_matrix).astype(int)
-        desired_corner_image = project_world_to_image_plane(desired_corner, world_to_camera, camera_matrix).astype(int)
-        error = np.linalg.norm(desired_corner - corner)
-        image = cv2.line(image, corner_image.T, desired_corner_image.T, color=error_color_map(error), thickness=1)
+    corners_image = project_world_points_to_image_plane(pull.ordered_corners, world_to_camera, camera_matrix)
+    desired_corners_image = project_world_points_to_image_plane(pull.desired_corners, world_to_camera, camera_matrix)
+    errors = np.linalg.norm(np.asarray(pull.desired_corners) - np.asarray(pull.ordered_corners), axis=1)
+    for corner_image, desired_corner_image, error in zip(
+        corners_image.astype(int), desired_corners_image.astype(int), errors
+    ):
+        image = cv2.line(image, corner_image, desired_corner_image, color=error_color_map(error), thickness=1)
 
     average_error = pull.average_corner_error()
     text = f"Average corner error: {average_error:.3f} m"
@@ -197,18 +233,17 @@ def visualize_pick_reorient_towel_pull(
     # draw_pose(image, grasp.get_pregrasp_pose(), world_to_camera, camera_matrix)
 
     def draw_corners(image, corners, color):
-        corners_image = [project_world_to_image_plane(corner, world_to_camera, camera_matrix) for corner in corners]
-        corners_image = np.array(corners_image, np.int32).reshape((-1, 1, 2))
+        corners_image = project_world_points_to_image_plane(corners, world_to_camera, camera_matrix)
+        corners_image = corners_image.astype(np.int32).reshape((-1, 1, 2))
         image = cv2.polylines(image, [corners_image], True, color, thickness=2)
         return image
 
     image = draw_corners(image, pull.ordered_corners, (0, 255, 255))
     image = draw_corners(image, pull.desired_corners, (0, 255, 0))
 
-    for corner, desired_corner in zip(pull.ordered_corners, pull.desired_corners):
-        project_world_to_image_plane(corner, world_to_camera, camera_matrix).astype(int)
-        desired_corner_image = project_world_to_image_plane(desired_corner, world_to_camera, camera_matrix).astype(int)
-        image = cv2.circle(image, desired_corner_image.T, 3, color=(0, 255, 0), thickness=4)
+    desired_corners_image = project_world_points_to_image_plane(pull.desired_corners, world_to_camera, camera_matrix)
+    for desired_corner_image in desired_corners_image.astype(int):
+        image = cv2.circle(image, desired_corner_image, 3, color=(0, 255, 0), thickness=4)
 
     start_image = project_world_to_image_plane(pull.start, world_to_camera, camera_matrix).astype(int)
     end_image = project_world_to_image_plane(pull.end, world_to_camera, camera_matrix).astype(int)
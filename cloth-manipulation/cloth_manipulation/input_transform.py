@@ -65,6 +65,12 @@ class InputTransform:
     resize_height = 256
     resize_width = 256
 
+    @classmethod
+    def crop_rectangle(cls) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """The crop as ((u_top, v_top), (u_bottom, v_bottom)) pixel coordinates in the original image."""
+        u_top, v_top = cls.crop_start_u, cls.crop_start_v
+        return (u_top, v_top), (u_top + cls.crop_width, v_top + cls.crop_height)
+
     @classmethod
     def crop_transform(cls):
         return CropKeypointImageTransform(cls.crop_start_u, cls.crop_width, cls.crop_start_v, cls.crop_height)
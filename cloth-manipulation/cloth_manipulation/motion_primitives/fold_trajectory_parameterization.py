@@ -1,5 +1,3 @@
-from typing import List
-
 import numpy as np
 from cloth_manipulation.geometry import top_down_orientation
 
@@ -36,7 +34,18 @@ class FoldTrajectory:
             self.center, self.x, self.y, self.z
         )
 
-    def _fold_pose(self, t):
+        # the same completions (e.g. 0 and 1) are requested for the grasp, pregrasp and retreat poses.
+        self._fold_pose_cache = {}
+
+    def _fold_pose(self, t) -> np.ndarray:
+        key = round(float(t), 6)
+        if key not in self._fold_pose_cache:
+            self._fold_pose_cache[key] = self._fold_pose_batch(np.array([t]))[0]
+        # return a copy because callers modify the returned pose in place.
+        return self._fold_pose_cache[key].copy()
+
+    def _fold_pose_batch(self, t: np.ndarray) -> np.ndarray:
+        """Evaluates the fold parameterization for an array of N completions t and returns an (N, 4, 4) array."""
         raise NotImplementedError
 
     def get_grasp_pose(self):
@@ -48,10 +57,9 @@ class FoldTrajectory:
     def get_retreat_pose(self, offest=0.06):
         raise NotImplementedError
 
-    def get_fold_path(self, n_waypoints: int = 50) -> List[np.ndarray]:
-        """Samples n_waypoints from the fold path and return them as a list of 4x4 poses."""
-        waypoints = [self._fold_pose(completion) for completion in np.linspace(0, 1, n_waypoints)]
-        return np.array(waypoints)
+    def get_fold_path(self, n_waypoints: int = 50) -> np.ndarray:
+        """Samples n_waypoints from the fold path and return them as an (n_waypoints, 4, 4) array of poses."""
+        return self._fold_pose_batch(np.linspace(0, 1, n_waypoints))
 
 
 class CircularFoldTrajectory(FoldTrajectory):
@@ -59,42 +67,51 @@ class CircularFoldTrajectory(FoldTrajectory):
         super().__init__(start, end)
         self.grasp_offset = grasp_offset
 
+        # constants of the parameterization, these don't depend on the completion t.
+        self._position_start_angle = 0
+        self._position_end_angle = np.pi - np.pi / 32
+        # the radius was manually tuned on a cloth to find a balance between grasp width along the cloth and grasp robustness given the gripper fingers.
+        self._radius = self.len / 2.0 - 0.03
+
+        self._grasp_angle = np.pi / 10
+        # bring finger tip down to zero.
+        self._z_offset = (0.085 / 2 * np.sin(self._grasp_angle) - 0.008) * np.cos(
+            self._grasp_angle
+        )  # want the low finger to touch the table so offset from TCP
+        self._z_offset -= 0.008  # 8mm compliance for better grasping
+        self._end_orientation_angle = -np.pi / 6
+
     def get_grasp_pose(self):
         grasp_pose = self._fold_pose(0)
         offset = self.y * self.grasp_offset
         grasp_pose[:3, -1] += offset
         return grasp_pose
 
-    def _fold_pose(self, t) -> np.ndarray:
+    def _fold_pose_batch(self, t: np.ndarray) -> np.ndarray:
         """Parameterization of the fold trajectory
         t = 0 is the grasp pose, t = 1 is the final (release) pose
         """
-        assert t <= 1 and t >= 0
-
-        position_start_angle = 0
-        position_end_angle = np.pi - np.pi / 32
-        position_angle = (1 - t) * position_start_angle + t * position_end_angle
-        # the radius was manually tuned on a cloth to find a balance between grasp width along the cloth and grasp robustness given the gripper fingers.
-        radius = self.len / 2.0 - 0.03
-        position = np.array([-radius * np.cos(position_angle), 0, radius * np.sin(position_angle)])
+        t = np.asarray(t, dtype=float)
+        assert np.all(t <= 1) and np.all(t >= 0)
 
-        grasp_angle = np.pi / 10
-        # bring finger tip down to zero.
-        position[2] += (0.085 / 2 * np.sin(grasp_angle) - 0.008) * np.cos(
-            grasp_angle
-        )  # want the low finger to touch the table so offset from TCP
-        position[2] -= 0.008  # 8mm compliance for better grasping
+        position_angle = (1 - t) * self._position_start_angle + t * self._position_end_angle
 
         # orientation_angle = max(grasp_angle - t * 2 * grasp_angle, -np.pi / 4)
-        end_angle = -np.pi / 6
-        orientation_angle = (t * end_angle) + (1 - t) * grasp_angle
-        x = np.array([np.cos(orientation_angle), 0, np.sin(orientation_angle)])
-        x /= np.linalg.norm(x)
-        y = np.array([0, -1, 0])
-
-        z = np.cross(x, y)
-        # Refactor TODO
-        return self.fold_frame_in_robot_frame @ transformation_matrix_from_position_and_vecs(position, x, y, z)
+        orientation_angle = (t * self._end_orientation_angle) + (1 - t) * self._grasp_angle
+        cos_orientation = np.cos(orientation_angle)
+        sin_orientation = np.sin(orientation_angle)
+
+        # x = [cos, 0, sin], y = [0, -1, 0] and z = x cross y = [sin, 0, -cos]
+        local_poses = np.tile(np.eye(4), (len(t), 1, 1))
+        local_poses[:, 0, 0] = cos_orientation
+        local_poses[:, 2, 0] = sin_orientation
+        local_poses[:, 1, 1] = -1
+        local_poses[:, 0, 2] = sin_orientation
+        local_poses[:, 2, 2] = -cos_orientation
+        local_poses[:, 0, 3] = -self._radius * np.cos(position_angle)
+        local_poses[:, 2, 3] = self._radius * np.sin(position_angle) + self._z_offset
+
+        return np.einsum("ij,njk->nik", self.fold_frame_in_robot_frame, local_poses)
 
     def get_pregrasp_pose(self, offset=0.05):
         grasp_pose = self.get_grasp_pose()
@@ -1,7 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from cloth_manipulation.geometry import angle_2D, get_ordered_keypoints, get_short_and_long_edges, rotate_point
+from cloth_manipulation.geometry import (
+    angle_2D,
+    get_ordered_keypoints,
+    get_short_and_long_edges,
+    rotation_matrix_from_rotvec,
+)
 from cloth_manipulation.hardware.base_classes import DualArm, RobotArm
-from scipy.spatial.transform import Rotation
 
 
 class PullPrimitive:
@@ -21,10 +27,33 @@ class PullPrimitive:
         pose[:3, 3] = position
         return pose
 
+    @staticmethod
+    def lifted_pose(pose, height=0.05):
+        lifted_pose = np.copy(pose)
+        lifted_pose[2, 3] += height
+        return lifted_pose
+
+    # The pregrasp and retreat poses are rebuilt only when the start or end pose is (re)assigned, not on every get.
+    @property
+    def start_pose(self):
+        return self._start_pose
+
+    @start_pose.setter
+    def start_pose(self, pose):
+        self._start_pose = pose
+        self._pre_grasp_pose = self.lifted_pose(pose)
+
+    @property
+    def end_pose(self):
+        return self._end_pose
+
+    @end_pose.setter
+    def end_pose(self, pose):
+        self._end_pose = pose
+        self._retreat_pose = self.lifted_pose(pose)
+
     def get_pre_grasp_pose(self):
-        pregrasp_pose = np.copy(self.get_pull_start_pose())
-        pregrasp_pose[2, 3] += 0.05
-        return pregrasp_pose
+        return self._pre_grasp_pose
 
     def get_pull_start_pose(self):
         return self.start_pose
@@ -33,9 +62,7 @@ class PullPrimitive:
         return self.end_pose
 
     def get_pull_retreat_pose(self):
-        retreat_pose = np.copy(self.get_pull_end_pose())
-        retreat_pose[2, 3] += 0.05
-        return retreat_pose
+        return self._retreat_pose
 
     def __repr__(self) -> str:
         return f"pull {self.start_pose[:3,3]=} -> {self.end_pose[:3,3]=}"
@@ -57,7 +84,8 @@ class ReorientTowelPull(PullPrimitive):
 
     @staticmethod
     def closest_point(point, candidates):
-        distances = [np.linalg.norm(point - candidate) for candidate in candidates]
+        candidates = np.asarray(candidates)
+        distances = np.linalg.norm(candidates - point, axis=1)
         return candidates[np.argmin(distances)]
 
     @staticmethod
@@ -76,22 +104,17 @@ class ReorientTowelPull(PullPrimitive):
         top_down = ReorientTowelPull.top_down_orientation(gripper_open_direction)
 
         gripper_y = top_down[:, 1]
-        rotation = Rotation.from_rotvec(np.deg2rad(tilt_angle) * gripper_y)
+        rotation_matrix = rotation_matrix_from_rotvec(np.deg2rad(tilt_angle) * gripper_y)
 
-        gripper_orienation = rotation.as_matrix() @ top_down
+        gripper_orienation = rotation_matrix @ top_down
 
         return gripper_orienation
 
     @staticmethod
     def get_desired_corners(ordered_corners):
-        corners = ordered_corners
+        corners = np.asarray(ordered_corners)
         short_edges, _ = get_short_and_long_edges(corners)
-        middles = []
-        for edge in short_edges:
-            corner0 = corners[edge[0]]
-            corner1 = corners[edge[1]]
-            middle = (corner0 + corner1) / 2
-            middles.append(middle)
+        middles = [(corners[edge[0]] + corners[edge[1]]) / 2 for edge in short_edges]
 
         # Ensure the middle with highest y-value is first
         if middles[0][1] < middles[1][1]:
@@ -102,44 +125,45 @@ class ReorientTowelPull(PullPrimitive):
 
         angle = angle_2D(towel_y_axis, y_axis)
         towel_center = np.mean(corners, axis=0)
-        z_axis = np.array([0, 0, 1])
-
-        rotated_corners = [rotate_point(corner, towel_center, z_axis, angle) for corner in corners]
-        centered_corners = [corner - towel_center for corner in rotated_corners]
-
-        x_min, x_max, y_min, y_max = 1.0, -1.0, 1.0, -1.0
-
-        for x, y, _ in centered_corners:
-            x_min = min(x_min, x)
-            x_max = max(x_max, x)
-            y_min = min(y_min, y)
-            y_max = max(y_max, y)
-
-        bbox_corners = []
-        bbox_corners.append(np.array([x_max, y_max, 0.0]))
-        bbox_corners.append(np.array([x_min, y_max, 0.0]))
-        bbox_corners.append(np.array([x_min, y_min, 0.0]))
-        bbox_corners.append(np.array([x_max, y_min, 0.0]))
 
-        desired_corners = []
+        # Rotate all corners around the towel center at once, this directly gives the centered corners.
+        # The rotation is around the z-axis, so only the x and y coordinates change.
+        cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+        rotation_matrix_2D = np.array([[cos_angle, -sin_angle], [sin_angle, cos_angle]])
+        centered_corners = corners - towel_center
+        centered_corners[:, :2] = centered_corners[:, :2] @ rotation_matrix_2D.T
+
+        x_min, y_min = centered_corners[:, :2].min(axis=0)
+        x_max, y_max = centered_corners[:, :2].max(axis=0)
+
+        bbox_corners = np.array(
+            [
+                [x_max, y_max, 0.0],
+                [x_min, y_max, 0.0],
+                [x_min, y_min, 0.0],
+                [x_max, y_min, 0.0],
+            ]
+        )
 
-        for centered_corner in centered_corners:
-            closest_bbox_corner = ReorientTowelPull.closest_point(centered_corner, bbox_corners)
-            desired_corners.append(closest_bbox_corner)
+        distances = np.linalg.norm(centered_corners[:, np.newaxis, :] - bbox_corners[np.newaxis, :, :], axis=2)
+        desired_corners = bbox_corners[np.argmin(distances, axis=1)]
         return desired_corners, centered_corners
 
     @staticmethod
     def select_best_pull_positions(corners, desired_corners):
+        corners = np.asarray(corners)
+        desired_corners = np.asarray(desired_corners)
         towel_center = np.mean(corners, axis=0)
-        scores = []
-        for corner, desired in zip(corners, desired_corners):
-            center_to_corner = corner - towel_center
-            pull = desired - corner
-            if np.linalg.norm(pull) < 0.05:
-                scores.append(-1)
-                continue
-            alignment = ReorientTowelPull.vector_cosine(center_to_corner, pull)
-            scores.append(alignment)
+        centers_to_corners = corners - towel_center
+        pulls = desired_corners - corners
+        pull_lengths = np.linalg.norm(pulls, axis=1)
+
+        # Pulls that are too short get the lowest possible score, the others are scored by their alignment.
+        scores = np.full(len(corners), -1.0)
+        valid = pull_lengths >= 0.05
+        alignments = np.einsum("ij,ij->i", centers_to_corners[valid], pulls[valid])
+        alignments /= np.linalg.norm(centers_to_corners[valid], axis=1) * pull_lengths[valid]
+        scores[valid] = alignments
 
         best_id = np.argmax(scores)
         start = corners[best_id]
@@ -181,20 +205,37 @@ class ReorientTowelPull(PullPrimitive):
             [np.linalg.norm(corner - desired) for corner, desired in zip(self.ordered_corners, self.desired_corners)]
         )
 
+    def get_safe_poses_for_robot(self, start, end, robot: RobotArm):
+        """Returns the start and end pose of the pull for this robot, or None if either of them is unsafe."""
+        robot_position = robot.robot_in_world_pose[:3, -1]
+
+        # the end pose is only built when the start pose is safe.
+        start_pose = np.eye(4)
+        start_pose[:3, :3] = self.tilted_pull_orientation(start, robot_position)
+        start_pose[:3, 3] = start
+        if robot.is_pose_unsafe(start_pose):
+            return None
+
+        end_pose = np.eye(4)
+        end_pose[:3, :3] = self.tilted_pull_orientation(end, robot_position)
+        end_pose[:3, 3] = end
+        if robot.is_pose_unsafe(end_pose):
+            return None
+
+        return start_pose, end_pose
+
     def set_robot_and_orientations(self, start, end, dual_arm: DualArm):
-        for robot in dual_arm.arms:
-            start_orientation = self.tilted_pull_orientation(start, robot.robot_in_world_pose[:3, -1])
-            end_orientation = self.tilted_pull_orientation(end, robot.robot_in_world_pose[:3, -1])
-
-            start_pose = np.eye(4)
-            start_pose[:3, :3] = start_orientation
-            start_pose[:3, 3] = start
-            end_pose = np.eye(4)
-            end_pose[:3, :3] = end_orientation
-            end_pose[:3, 3] = end
-
-            if not robot.is_pose_unsafe(start_pose) and not robot.is_pose_unsafe(end_pose):
-                self.start_pose, self.end_pose, self.robot = start_pose, end_pose, robot
+        # The safety checks can query the robot controllers, so both arms are checked concurrently.
+        # The results are still considered in arm order, so the left arm is preferred when both can execute the pull.
+        with ThreadPoolExecutor(max_workers=len(dual_arm.arms)) as executor:
+            safe_poses_per_robot = list(
+                executor.map(lambda robot: self.get_safe_poses_for_robot(start, end, robot), dual_arm.arms)
+            )
+
+        for robot, safe_poses in zip(dual_arm.arms, safe_poses_per_robot):
+            if safe_poses is not None:
+                self.start_pose, self.end_pose = safe_poses
+                self.robot = robot
                 return
 
         raise ValueError(f"Pull could not be executed by either robot. \nStart: \n{start} \nEnd: \n{end}")
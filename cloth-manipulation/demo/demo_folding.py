@@ -101,6 +101,9 @@ def control_loop(keypoint_observer):  # noqa: C901
     global start_image_saved
     global intermediate_image_saved
 
+    # allocated once and cleared every iteration, the panel size doesn't change.
+    buffer = np.zeros_like(top_left_panel.image_buffer)
+
     while not stop_control_thread:
         if init_image is not None:
             start = time.time()
@@ -135,7 +138,7 @@ def control_loop(keypoint_observer):  # noqa: C901
 
         image = draw_cloth_transform_rectangle(image)
 
-        buffer = np.zeros_like(top_left_panel.image_buffer)
+        buffer.fill(0)
         Panel.fit_image_into_buffer(image, buffer)
         text = f"{Modes(_mode).name}"
         font = cv2.FONT_HERSHEY_SIMPLEX
@@ -214,6 +217,7 @@ while True:
     panels.top_right.fill_image_buffer(images[CameraMapping.serial_top])
     panels.bottom_left.fill_image_buffer(images[CameraMapping.serial_front])
     panels.bottom_right.fill_image_buffer(images[CameraMapping.serial_side])
+    panels.compose()
 
     cv2.putText(
         panels.image_buffer,